@@ -0,0 +1,810 @@
+"""
+Encoding of string arrays with pretrained fastText embeddings.
+
+Each string is mapped to the sentence vector computed by a pretrained
+fastText model (https://fasttext.cc/docs/en/crawl-vectors.html): the
+average of the normalized word and subword (character n-gram) vectors
+composing the string. Strings sharing words or character n-grams thus
+get close embeddings, which captures both morphological and semantic
+similarities between categories.
+
+This encoder requires the optional `fasttext` package, and downloads
+the pretrained binaries (several GB) on first use.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import uuid
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from .utils import LRUDict
+
+
+def _import_fasttext():
+    """ Import the optional fasttext dependency with a helpful message. """
+    try:
+        import fasttext
+        import fasttext.util
+    except ImportError as e:
+        raise ImportError(
+            'Loading fastText models requires the fasttext package. '
+            'Install it with "pip install fasttext".') from e
+    return fasttext
+
+
+class UniqueEmbedding(NamedTuple):
+    """ Compact result of a transform with return_unique=True: the
+    embeddings of the unique input strings, and for each input row the
+    index of its embedding.
+
+    For highly repetitive columns this is smaller than the dense array
+    by a factor n_samples / n_unique, and linear operations can stay
+    compact: ``(X @ w)[i] == (unique_vectors @ w)[inverse_indices[i]]``.
+    """
+    unique_vectors: np.ndarray
+    inverse_indices: np.ndarray
+
+    def to_dense(self):
+        """ Materialize the full (n_samples, n_components) array. """
+        return self.unique_vectors[self.inverse_indices]
+
+    def __array__(self, dtype=None):
+        dense = self.to_dense()
+        if dtype is not None:
+            dense = dense.astype(dtype, copy=False)
+        return dense
+
+
+_numba_kernels = None
+
+
+def _get_numba_kernels():
+    """ Compile (once) the Numba embedding kernels.
+
+    embed_word hashes the byte n-grams of one word and accumulates the
+    matching rows of the input matrix, mirroring fastText's
+    computeSubwords: n-gram boundaries respect UTF-8 continuation
+    bytes, and each n-gram is hashed with FNV-1a over sign-extended
+    bytes then taken modulo the bucket count. Rows are multiplied by a
+    per-row scale, which dequantizes int8 matrices on the fly (the
+    scale is all ones for float32 matrices).
+
+    embed_string runs embed_word on each space-separated word of a
+    byte buffer, L2-normalizing each word vector before averaging --
+    the same pooling as get_sentence_vector -- so no per-word work is
+    left in Python.
+
+    embed_batch embeds many strings packed into one contiguous byte
+    buffer with an offsets array, parallelizing over samples with
+    prange.
+    """
+    global _numba_kernels
+    if _numba_kernels is not None:
+        return _numba_kernels
+    try:
+        from numba import njit, prange
+    except ImportError as e:
+        raise ImportError(
+            'use_numba=True requires the numba package. '
+            'Install it with "pip install numba".') from e
+
+    @njit(cache=True)
+    def embed_word(data, W, scale, vocab_rows, bucket, minn, maxn,
+                   out):
+        n = data.shape[0]
+        count = 0
+        for i in range(n):
+            if (data[i] & 0xC0) == 0x80:
+                # continuation byte: not the start of a character
+                continue
+            h = 2166136261
+            j = i
+            length = 0
+            while j < n and length < maxn:
+                c = int(data[j])
+                j += 1
+                if c >= 128:
+                    c -= 256
+                h = ((h ^ c) * 16777619) & 0xFFFFFFFF
+                while j < n and (data[j] & 0xC0) == 0x80:
+                    c = int(data[j])
+                    j += 1
+                    if c >= 128:
+                        c -= 256
+                    h = ((h ^ c) * 16777619) & 0xFFFFFFFF
+                length += 1
+                if length >= minn and not (
+                        length == 1 and (i == 0 or j == n)):
+                    row = vocab_rows + h % bucket
+                    s = scale[row]
+                    for d in range(W.shape[1]):
+                        out[d] += W[row, d] * s
+                    count += 1
+        return count
+
+    @njit(cache=True)
+    def embed_string(data, W, scale, vocab_rows, bucket, minn, maxn,
+                     word_vector, out):
+        dim = W.shape[1]
+        n = data.shape[0]
+        n_words = 0
+        start = 0
+        while start < n:
+            end = start
+            while end < n and data[end] != 32:  # space
+                end += 1
+            if end > start:
+                for d in range(dim):
+                    word_vector[d] = 0.0
+                embed_word(data[start:end], W, scale, vocab_rows,
+                           bucket, minn, maxn, word_vector)
+                # normalizing the sum also normalizes the average
+                sq = 0.0
+                for d in range(dim):
+                    sq += word_vector[d] * word_vector[d]
+                if sq > 0:
+                    inv = 1.0 / np.sqrt(sq)
+                    for d in range(dim):
+                        out[d] += word_vector[d] * inv
+                n_words += 1
+            start = end + 1
+        if n_words > 0:
+            for d in range(dim):
+                out[d] /= n_words
+
+    @njit(parallel=True, cache=True)
+    def embed_batch(buf, offs, W, scale, vocab_rows, bucket, minn,
+                    maxn, out):
+        for i in prange(offs.shape[0] - 1):
+            # per-thread scratch
+            word_vector = np.empty(W.shape[1], dtype=np.float32)
+            embed_string(buf[offs[i]:offs[i + 1]], W, scale,
+                         vocab_rows, bucket, minn, maxn, word_vector,
+                         out[i])
+
+    _numba_kernels = (embed_word, embed_string, embed_batch)
+    return _numba_kernels
+
+
+class PretrainedFastText(BaseEstimator, TransformerMixin):
+    """
+    Encode string categorical features as a numeric array, using the
+    sentence vectors of a pretrained fastText model.
+
+    Parameters
+    ----------
+    n_components : int, default=300
+        The dimension of the embeddings. Pretrained models are
+        distributed with 300 dimensions; smaller values trigger a
+        dimension reduction of the model at load time.
+    language : str {'english', 'french', 'hungarian'}, default=english
+        The language of the pretrained model to use.
+    bin_dir : str, default='.'
+        Directory where the pretrained binaries are searched for and
+        downloaded to.
+    cache_path : str, default=None
+        If given, embeddings are persisted on disk under this path
+        prefix (one cache per language and n_components), so that
+        repeated transform calls on overlapping vocabularies -- e.g.
+        cross-validation folds -- reuse previous computations instead
+        of re-embedding the strings.
+    cache_size : int, default=100000
+        Capacity of the in-process LRU cache of embeddings.
+    n_jobs : int, default=1
+        Number of threads embedding strings in parallel. The fastText
+        binding releases the GIL during the n-gram hashing and
+        averaging, so this scales with physical cores; -1 means using
+        all processors.
+    output_dtype : numpy dtype, default=np.float32
+        The dtype of the transformed output. fastText computes float32
+        vectors, so this is the cheapest exact choice; np.float16
+        halves the memory traffic of the output at a small precision
+        cost for downstream estimators.
+    intern_strings : bool, default=False
+        If True, run sys.intern on the input strings before
+        deduplication, so that equal strings share one object: the
+        hash lookups of the dedup and the embedding caches then
+        short-circuit on pointer identity. Worthwhile when the same
+        estimator transforms many batches drawn from a stable
+        vocabulary; interned strings stay alive for the process
+        lifetime, so this trades some long-lived memory.
+    return_unique : bool, default=False
+        If True, transform returns a UniqueEmbedding pair (embeddings
+        of the unique strings, inverse indices) instead of the dense
+        array, leaving the row expansion to the caller. For columns
+        with many repeated entries this saves a factor
+        n_samples / n_unique in memory; call .to_dense() to
+        materialize the full array.
+    use_numba : bool, default=False
+        If True, bypass the fastText binding in transform and embed
+        strings with a Numba kernel hashing the byte n-grams directly
+        against the model's input matrix. This approximates
+        get_sentence_vector: rows of in-vocabulary words are ignored,
+        only subword n-gram rows are averaged. Requires the numba
+        package.
+    quantize_inference : bool, default=False
+        If True, the Numba path keeps the input matrix quantized to
+        int8 with one scale per row instead of float32, shrinking its
+        memory footprint 4x at a small precision cost. Only affects
+        use_numba=True; the binding path keeps fastText's own matrix.
+
+    References
+    ----------
+    For more details on the embedding method, see
+    `Enriching Word Vectors with Subword Information
+    <https://arxiv.org/abs/1607.04606>`_ by Bojanowski et al. (2017).
+    """
+
+    _lang_to_bin = {
+        'english': 'cc.en.%d.bin',
+        'french': 'cc.fr.%d.bin',
+        'hungarian': 'cc.hu.%d.bin',
+    }
+
+    def __init__(self, n_components=300, language='english', bin_dir='.',
+                 cache_path=None, cache_size=100_000, n_jobs=1,
+                 output_dtype=np.float32, intern_strings=False,
+                 return_unique=False, use_numba=False,
+                 quantize_inference=False):
+        self.n_components = n_components
+        self.language = language
+        self.bin_dir = bin_dir
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self.n_jobs = n_jobs
+        self.output_dtype = output_dtype
+        self.intern_strings = intern_strings
+        self.return_unique = return_unique
+        self.use_numba = use_numba
+        self.quantize_inference = quantize_inference
+        if language not in self._lang_to_bin:
+            raise ValueError(
+                'language should be one of %s, got %r'
+                % (sorted(self._lang_to_bin), language))
+        self._ft_model = None
+        self._mem_cache = LRUDict(capacity=cache_size)
+        self._disk_index = None
+        self._disk_vectors = None
+
+    @property
+    def ft_model(self):
+        """ The pretrained fastText model, loaded on first access.
+
+        Loading is deferred so that instantiating the estimator (e.g.
+        for get_params, cloning in GridSearchCV, or pickling) stays
+        free of the multi-GB model load.
+        """
+        if self._ft_model is None:
+            self.load_model()
+        return self._ft_model
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The C++ model and the caches derived from it are not
+        # picklable (and would be huge); they are reloaded lazily
+        # after unpickling.
+        state['_ft_model'] = None
+        state['_W'] = None
+        state.pop('_W_q', None)
+        state.pop('_W_scale', None)
+        state.pop('_W_unit_scale', None)
+        state['_mem_cache'] = LRUDict(capacity=self.cache_size)
+        state['_disk_index'] = None
+        state['_disk_vectors'] = None
+        state.pop('_shm', None)
+        return state
+
+    def share_input_matrix(self):
+        """ Copy the model's input matrix into a shared memory block
+        that worker processes can attach to with from_shared.
+
+        With the loky/multiprocessing backends each worker would
+        otherwise load its own copy of the multi-GB model, making RSS
+        scale with the number of workers instead of staying O(1).
+
+        Returns
+        -------
+        dict
+            A small picklable descriptor to pass to workers.
+        """
+        from multiprocessing import shared_memory
+        W, bucket, minn, maxn = self._model_params()
+        shm = shared_memory.SharedMemory(create=True, size=W.nbytes)
+        shared = np.ndarray(W.shape, dtype=W.dtype, buffer=shm.buf)
+        shared[:] = W
+        # keep the segment alive as long as the estimator
+        self._shm = shm
+        return {'shm_name': shm.name, 'shape': W.shape,
+                'bucket': bucket, 'minn': minn, 'maxn': maxn,
+                'params': self.get_params()}
+
+    @classmethod
+    def from_shared(cls, descriptor):
+        """ Build an estimator attached to a shared input matrix.
+
+        Call this in worker initializers with the descriptor returned
+        by share_input_matrix. The estimator embeds with the Numba
+        kernel (the fastText binding cannot adopt external memory) and
+        never loads its own copy of the model.
+        """
+        from multiprocessing import shared_memory
+        params = dict(descriptor['params'], use_numba=True)
+        encoder = cls(**params)
+        shm = shared_memory.SharedMemory(name=descriptor['shm_name'])
+        encoder._shm = shm
+        encoder._W = np.ndarray(
+            descriptor['shape'], dtype=np.float32, buffer=shm.buf)
+        encoder._bucket = descriptor['bucket']
+        encoder._minn = descriptor['minn']
+        encoder._maxn = descriptor['maxn']
+        return encoder
+
+    def __del__(self):
+        # Release the C++ model eagerly: it can hold several GB and
+        # notebook workflows often keep old estimators reachable.
+        self.__dict__.pop('_ft_model', None)
+
+    def bin_path(self, n_components):
+        """ Path of the model binary for a given dimension. """
+        return os.path.join(
+            self.bin_dir, self._lang_to_bin[self.language] % n_components)
+
+    def download_model(self):
+        """ Download the pretrained 300-dim binary for self.language
+        into self.bin_dir. """
+        from .datasets.utils import request_get, _uncompress_file
+        os.makedirs(self.bin_dir, exist_ok=True)
+        gz_name = self._lang_to_bin[self.language] % 300 + '.gz'
+        gz_path = os.path.join(self.bin_dir, gz_name)
+        url = ('https://dl.fbaipublicfiles.com/fasttext/vectors-crawl/'
+               + gz_name)
+        temp_path = gz_path + '.part'
+        response = request_get(url, stream=True)
+        response.raise_for_status()
+        with open(temp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=2 ** 20):
+                f.write(chunk)
+        os.replace(temp_path, gz_path)
+        _uncompress_file(gz_path)
+
+    def load_model(self):
+        """ Load the pretrained model, downloading and reducing it to
+        n_components dimensions if needed. """
+        fasttext = _import_fasttext()
+        path = self.bin_path(self.n_components)
+        ftz_path = path[:-4] + '.ftz'
+        if os.path.exists(ftz_path):
+            # fastText loads its product-quantized format transparently
+            self._ft_model = fasttext.load_model(ftz_path)
+        elif os.path.exists(path):
+            self._ft_model = fasttext.load_model(path)
+        else:
+            if not os.path.exists(self.bin_path(300)):
+                self.download_model()
+            self._ft_model = fasttext.load_model(self.bin_path(300))
+            if self.n_components < 300:
+                self.reduce_model(self.n_components)
+                self.save_model()
+        if self.use_numba:
+            # Pin the matrix view once at load time rather than on the
+            # first transform call
+            self._model_params()
+        return self
+
+    def reduce_model(self, n_components):
+        """ Reduce the loaded model to n_components dimensions.
+
+        For strong reductions (n_components below a quarter of the
+        model dimension), a truncated randomized SVD is run on the
+        input matrix instead of the full PCA done by
+        fasttext.util.reduce_model: the work and scratch memory then
+        scale with n_components rather than with the square of the
+        model dimension. Milder reductions, or fasttext versions
+        without the set_matrices binding, keep the library path.
+        """
+        fasttext = _import_fasttext()
+        set_matrices = getattr(self.ft_model, 'set_matrices', None)
+        if (set_matrices is None
+                or n_components >= self.ft_model.get_dimension() // 4):
+            fasttext.util.reduce_model(self.ft_model, n_components)
+            return
+        from sklearn.decomposition import TruncatedSVD
+        input_matrix = self.ft_model.get_input_matrix()
+        # Fitting on a row sample is enough for the projection, and
+        # keeps the SVD scratch memory bounded for multi-million row
+        # matrices.
+        rng = np.random.default_rng(0)
+        sample_idx = rng.choice(
+            len(input_matrix), size=min(len(input_matrix), 100_000),
+            replace=False)
+        svd = TruncatedSVD(
+            n_components=n_components, algorithm='randomized',
+            n_iter=5, random_state=0).fit(input_matrix[sample_idx])
+        set_matrices(
+            self._project_batched(input_matrix, svd.components_),
+            self._project_batched(
+                self.ft_model.get_output_matrix(), svd.components_))
+
+    @staticmethod
+    def _project_batched(matrix, components, batch_size=10_000):
+        """ Compute matrix @ components.T in row batches, writing into
+        a preallocated float32 array so that at most one batch of the
+        full-dimension rows is live at a time. """
+        out = np.empty(
+            (len(matrix), components.shape[0]), dtype=np.float32)
+        for start in range(0, len(matrix), batch_size):
+            batch = slice(start, start + batch_size)
+            out[batch] = matrix[batch] @ components.T
+        return out
+
+    def save_model(self):
+        """ Save the loaded model in self.bin_dir. """
+        os.makedirs(self.bin_dir, exist_ok=True)
+        self.ft_model.save_model(
+            self.bin_path(self.ft_model.get_dimension()))
+
+    @staticmethod
+    def _string_key(string):
+        """ Stable on-disk cache key of a string. """
+        return hashlib.sha1(string.encode('utf-8')).hexdigest()
+
+    def _cache_base(self):
+        """ Path prefix of the on-disk cache files; the language and
+        dimension are part of the name so that incompatible embeddings
+        never mix. """
+        return '%s.%s.%d' % (self.cache_path, self.language,
+                             self.n_components)
+
+    def _read_cache_snapshot(self):
+        """ Read the current on-disk cache snapshot, or None.
+
+        The .idx pickle holds both the {key: row} index and the name
+        of the vector file its rows point into, so a snapshot is
+        committed by the single atomic rename of .idx and an index can
+        never reference vectors it was not written with.
+        """
+        base = self._cache_base()
+        try:
+            with open(base + '.idx', 'rb') as f:
+                meta = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        vectors = np.memmap(
+            meta['vec_file'], dtype=np.float32, mode='r',
+            shape=(len(meta['index']), self.n_components))
+        return meta['index'], vectors, meta['vec_file']
+
+    def _load_disk_cache(self):
+        """ Lazily attach the on-disk cache: a pickled
+        {key: row} index and a memory-mapped float32 vector file. """
+        if self._disk_index is not None:
+            return
+        snapshot = self._read_cache_snapshot()
+        if snapshot is None:
+            self._disk_index = {}
+            self._disk_vectors = None
+        else:
+            self._disk_index, self._disk_vectors, _ = snapshot
+
+    def _append_disk_cache(self, strings, vectors):
+        """ Append newly computed embeddings to the on-disk cache.
+
+        The merged vectors are written to a fresh uniquely-named file,
+        and the index referencing it replaces .idx with one atomic
+        rename: concurrent processes (e.g. cross-validation workers
+        sharing a cache_path) always read a consistent snapshot. The
+        append starts from the latest snapshot on disk, so entries
+        written by other processes since our last read are kept; if
+        two processes commit simultaneously the last rename wins,
+        costing at worst some recomputation later, never wrong rows.
+        """
+        base = self._cache_base()
+        snapshot = self._read_cache_snapshot()
+        if snapshot is None:
+            index, disk_vectors, old_vec_file = {}, None, None
+        else:
+            index, disk_vectors, old_vec_file = snapshot
+        index = dict(index)
+        new_rows = []
+        for string, vector in zip(strings, vectors):
+            key = self._string_key(string)
+            if key not in index:
+                index[key] = len(index)
+                new_rows.append(vector)
+        if not new_rows:
+            self._disk_index = index
+            self._disk_vectors = disk_vectors
+            return
+        if disk_vectors is not None:
+            all_vectors = np.concatenate(
+                [disk_vectors, np.asarray(new_rows, dtype=np.float32)])
+        else:
+            all_vectors = np.asarray(new_rows, dtype=np.float32)
+        vec_file = '%s.%s.vec' % (base, uuid.uuid4().hex)
+        all_vectors.astype(np.float32, copy=False).tofile(vec_file)
+        with open(base + '.idx.tmp', 'wb') as f:
+            pickle.dump({'index': index, 'vec_file': vec_file}, f)
+        os.replace(base + '.idx.tmp', base + '.idx')
+        if old_vec_file is not None:
+            # best effort: readers that already mapped it keep their
+            # mapping alive on POSIX
+            try:
+                os.remove(old_vec_file)
+            except OSError:
+                pass
+        self._disk_index = index
+        self._disk_vectors = np.memmap(
+            vec_file, dtype=np.float32, mode='r',
+            shape=(len(index), self.n_components))
+
+    def fit(self, X, y=None):
+        """
+        Fit the PretrainedFastText to X. The model being pretrained,
+        this does not do anything.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, ) or (n_samples, 1)
+            The string data to encode.
+
+        Returns
+        -------
+        self
+            The fitted PretrainedFastText instance.
+        """
+        return self
+
+    def _batch_sentence_vectors(self, strings):
+        """
+        Compute the sentence vectors of a list of strings in a single
+        call into the fastText binding when possible.
+
+        The pybind11 `multilineGetSentenceVectors` method computes all
+        vectors in one C++ loop, avoiding a Python/C++ round-trip per
+        string. Older fasttext versions do not expose it, in which case
+        we fall back to the per-string call.
+
+        Parameters
+        ----------
+        strings : list of str
+            The strings to embed. They must not contain newlines.
+
+        Returns
+        -------
+        array, shape (len(strings), n_components)
+            The sentence vectors.
+        """
+        multiline = getattr(
+            self.ft_model.f, 'multilineGetSentenceVectors', None)
+        if multiline is not None:
+            vectors = multiline(strings)
+        else:
+            vectors = [self.ft_model.get_sentence_vector(x)
+                       for x in strings]
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _model_params(self):
+        """ Fetch (once) the input matrix and hashing parameters of
+        the loaded model, for paths bypassing the fastText binding.
+
+        _W is guaranteed C-contiguous float32, so downstream
+        numpy/Numba/Cython kernels (and BLAS row averaging) can use it
+        zero-copy; _bucket, _minn and _maxn are the model's hashing
+        parameters. These attributes are stable and may be read by
+        custom pooling kernels, but should never be written to.
+        """
+        if getattr(self, '_W', None) is None:
+            args = self.ft_model.f.getArgs()
+            self._W = np.ascontiguousarray(
+                self.ft_model.get_input_matrix(), dtype=np.float32)
+            self._bucket = args.bucket
+            self._minn = args.minn
+            self._maxn = args.maxn
+        return self._W, self._bucket, self._minn, self._maxn
+
+    def _quantized_params(self):
+        """ Int8 counterpart of _model_params: the input matrix with
+        one symmetric scale per row. The float32 copy is dropped once
+        quantized, dividing the pinned memory by four. """
+        if getattr(self, '_W_q', None) is None:
+            W, _, _, _ = self._model_params()
+            scale = np.abs(W).max(axis=1) / 127.
+            scale[scale == 0] = 1.
+            self._W_q = np.round(W / scale[:, None]).astype(np.int8)
+            self._W_scale = scale.astype(np.float32)
+            self._W = None
+        return (self._W_q, self._W_scale, self._bucket, self._minn,
+                self._maxn)
+
+    def _numba_sentence_vectors(self, strings):
+        """ Embed strings with the Numba subword kernel instead of the
+        fastText binding.
+
+        Like get_sentence_vector, the L2-normalized word vectors are
+        averaged over the words of each string; each word vector is
+        the average of its subword n-gram rows (the rows of
+        in-vocabulary word ids are not looked up, which makes this an
+        approximation of the fastText output). The strings are packed
+        into a single contiguous byte buffer plus an offsets array, so
+        the whole batch is one kernel call parallelized over samples.
+        """
+        _, _, embed_batch = _get_numba_kernels()
+        if self.quantize_inference:
+            W, scale, bucket, minn, maxn = self._quantized_params()
+        else:
+            W, bucket, minn, maxn = self._model_params()
+            if getattr(self, '_W_unit_scale', None) is None or \
+                    len(self._W_unit_scale) != len(W):
+                self._W_unit_scale = np.ones(len(W), dtype=np.float32)
+            scale = self._W_unit_scale
+        vocab_rows = W.shape[0] - bucket
+        out = np.zeros((len(strings), W.shape[1]), dtype=np.float32)
+        encoded = [
+            ' '.join('<%s>' % w for w in s.split()).encode('utf-8')
+            for s in strings]
+        offs = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offs[1:])
+        buf = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        embed_batch(buf, offs, W, scale, vocab_rows, bucket, minn,
+                    maxn, out)
+        return out
+
+    def _sentence_vectors(self, strings):
+        """ Compute sentence vectors, splitting the work over n_jobs
+        threads when requested. Threads are enough because the hashing
+        and averaging run in C++ with the GIL released. """
+        if self.use_numba:
+            return self._numba_sentence_vectors(strings)
+        n_jobs = effective_n_jobs(self.n_jobs)
+        if n_jobs == 1 or len(strings) < 2 * n_jobs:
+            return self._batch_sentence_vectors(strings)
+        chunks = [list(chunk) for chunk in
+                  np.array_split(np.asarray(strings, dtype=object),
+                                 n_jobs)]
+        results = Parallel(n_jobs=n_jobs, backend='threading')(
+            delayed(self._batch_sentence_vectors)(chunk)
+            for chunk in chunks)
+        return np.concatenate(results)
+
+    def transform(self, X):
+        """ Transform X using the pretrained fastText model.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, ) or (n_samples, 1)
+            The string data to encode.
+
+        Returns
+        -------
+        array, shape (n_samples, n_components)
+            Transformed input. If return_unique is True, a
+            UniqueEmbedding pair is returned instead.
+        """
+        unq_X_out, lookup = self._factorize_embed(X)
+        if self.return_unique:
+            return UniqueEmbedding(unq_X_out, lookup)
+        # np.take into a preallocated buffer expands rows with a
+        # contiguous memcpy, where fancy indexing goes through the
+        # generic per-row indexing machinery
+        X_out = np.empty(
+            (len(lookup), unq_X_out.shape[1]), dtype=unq_X_out.dtype)
+        np.take(unq_X_out, lookup, axis=0, out=X_out)
+        return X_out
+
+    def transform_iter(self, X, batch_size=65536):
+        """ Transform X, yielding the output rows in batches.
+
+        Unlike transform, this never materializes the full
+        (n_samples, n_components) array: only the unique-string
+        embeddings and one batch are live at a time, so memory-bound
+        callers can stream arbitrarily large columns.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, ) or (n_samples, 1)
+            The string data to encode.
+        batch_size : int, default=65536
+            Number of output rows per yielded batch.
+
+        Yields
+        ------
+        array, shape (batch_size, n_components)
+            Consecutive row batches of the transformed input (the
+            last one may be shorter).
+        """
+        unq_X_out, lookup = self._factorize_embed(X)
+        for start in range(0, len(lookup), batch_size):
+            yield np.take(
+                unq_X_out, lookup[start:start + batch_size], axis=0)
+
+    def partial_fit(self, X, y=None):
+        """ No-op, for consistency with streaming pipelines: the
+        model is pretrained, so there is nothing to update. """
+        return self
+
+    def _factorize_embed(self, X):
+        """ Validate X and return the embeddings of its unique
+        strings together with the inverse indices. """
+        if isinstance(X, pd.DataFrame) and X.shape[1] == 1:
+            X = X.iloc[:, 0]
+        if isinstance(X, pd.Series):
+            X = X.values
+        if isinstance(X, pd.Categorical):
+            # Categorical columns already carry their factorization:
+            # reuse it instead of re-hashing every row
+            unq_X = X.categories.to_numpy()
+            lookup = np.asarray(X.codes)
+        else:
+            X = np.asarray(X)
+            assert X.ndim == 1 or (X.ndim == 2 and X.shape[1] == 1), \
+                f"ERROR: shape {X.shape} of input array is not supported."
+            if X.ndim == 2:
+                X = X[:, 0]
+            assert isinstance(X[0], str), "ERROR: Input data is not string."
+
+            if self.intern_strings:
+                # sys.intern rejects str subclasses such as numpy.str_
+                # (the element type of '<U' arrays), so coerce first
+                X = np.fromiter(
+                    (sys.intern(str(s)) for s in X), dtype=object,
+                    count=len(X))
+            # Hash-based dedup: O(n) expected, vs the O(n log n) sort
+            # with Python-level comparisons of np.unique on object
+            # arrays. The unique strings come out in first-appearance
+            # order rather than sorted, which transform does not rely
+            # on.
+            lookup, unq_X = pd.factorize(X, sort=False)
+        # Both factorize and Categorical.codes mark missing values
+        # with -1, which the row expansion would silently map to the
+        # last unique string
+        if (lookup < 0).any():
+            raise ValueError('Found missing values in input data')
+        # fastText does not accept newlines inside sentences
+        unq_X = np.char.replace(np.asarray(unq_X).astype(str), '\n', ' ')
+        unq_X_out = self._embed_unique(list(unq_X))
+        # Cast the unique vectors before any expansion, so that a
+        # narrower output_dtype also shrinks the expanded rows
+        unq_X_out = unq_X_out.astype(self.output_dtype, copy=False)
+        return unq_X_out, lookup
+
+    def _embed_unique(self, strings):
+        """ Embed a list of unique strings, going through the
+        in-process and (if cache_path is set) on-disk caches, and only
+        calling into fastText for the strings not seen before. """
+        unq_X_out = np.empty(
+            (len(strings), self.n_components), dtype=np.float32)
+        use_disk = self.cache_path is not None
+        if use_disk:
+            self._load_disk_cache()
+        missing = []
+        missing_idx = []
+        for i, x in enumerate(strings):
+            if x in self._mem_cache:
+                unq_X_out[i] = self._mem_cache[x]
+                continue
+            if use_disk:
+                row = self._disk_index.get(self._string_key(x))
+                if row is not None:
+                    unq_X_out[i] = self._disk_vectors[row]
+                    # cache a copy: a row view would pin the whole
+                    # output array and alias what transform returns
+                    self._mem_cache[x] = unq_X_out[i].copy()
+                    continue
+            missing.append(x)
+            missing_idx.append(i)
+        if missing:
+            computed = self._sentence_vectors(missing)
+            unq_X_out[missing_idx] = computed
+            for x, vector in zip(missing, computed):
+                self._mem_cache[x] = vector.copy()
+            if use_disk:
+                self._append_disk_cache(missing, computed)
+        return unq_X_out
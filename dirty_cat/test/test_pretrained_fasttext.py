@@ -0,0 +1,240 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from dirty_cat import PretrainedFastText
+
+
+class FakeArgs:
+    bucket = 64
+    minn = 2
+    maxn = 4
+
+
+class FakeBinding:
+    """ Mimics the pybind object exposing multilineGetSentenceVectors. """
+
+    def __init__(self, model, multiline):
+        if multiline:
+            self.multilineGetSentenceVectors = \
+                lambda strings: [model.get_sentence_vector(s)
+                                 for s in strings]
+
+    def getArgs(self):
+        return FakeArgs()
+
+
+class FakeFastTextModel:
+    """ A tiny stand-in for a fastText model, to test the numpy logic
+    without downloading the multi-GB pretrained binaries. """
+
+    def __init__(self, dim=4, multiline=True):
+        self.dim = dim
+        self.n_calls = 0
+        self.f = FakeBinding(self, multiline)
+
+    def get_sentence_vector(self, string):
+        assert '\n' not in string
+        self.n_calls += 1
+        rng = np.random.RandomState(abs(hash(string)) % (2 ** 31))
+        return rng.rand(self.dim).astype(np.float32)
+
+    def get_dimension(self):
+        return self.dim
+
+    def get_input_matrix(self):
+        rng = np.random.RandomState(0)
+        return rng.rand(
+            10 + FakeArgs.bucket, self.dim).astype(np.float32)
+
+
+def fake_encoder(dim=4, multiline=True, **kwargs):
+    encoder = PretrainedFastText(n_components=dim, **kwargs)
+    encoder._ft_model = FakeFastTextModel(dim=dim, multiline=multiline)
+    return encoder
+
+
+@pytest.mark.parametrize('multiline', [True, False])
+def test_transform(multiline):
+    encoder = fake_encoder(multiline=multiline)
+    X = np.array(['alice', 'bob', 'alice', 'carole\nd'])
+    y = encoder.fit_transform(X)
+    assert y.shape == (4, 4)
+    # Duplicated strings share their embedding
+    np.testing.assert_array_equal(y[0], y[2])
+    # Newlines are replaced before embedding
+    np.testing.assert_array_equal(
+        y[3], encoder.ft_model.get_sentence_vector('carole d'))
+    # 2-D single-column input is accepted
+    y2 = encoder.transform(X.reshape(-1, 1))
+    np.testing.assert_array_equal(y, y2)
+
+
+def test_batched_matches_loop():
+    X = ['one', 'two', 'three', 'two']
+    y_batched = fake_encoder(multiline=True).transform(X)
+    y_loop = fake_encoder(multiline=False).transform(X)
+    np.testing.assert_array_equal(y_batched, y_loop)
+
+
+def test_n_jobs():
+    X = ['s%d' % i for i in range(50)] * 2
+    y_seq = fake_encoder().transform(X)
+    y_par = fake_encoder(n_jobs=2).transform(X)
+    np.testing.assert_array_equal(y_seq, y_par)
+
+
+def test_return_unique():
+    X = ['red', 'green', 'red', 'red']
+    dense = fake_encoder().transform(X)
+    compact = fake_encoder(return_unique=True).transform(X)
+    assert compact.unique_vectors.shape == (2, 4)
+    assert len(compact.inverse_indices) == 4
+    np.testing.assert_array_equal(compact.to_dense(), dense)
+    np.testing.assert_array_equal(np.asarray(compact), dense)
+
+
+def test_cache_does_not_alias_output():
+    # Mutating a returned result must not corrupt cached embeddings
+    encoder = fake_encoder(return_unique=True)
+    X = ['red', 'green']
+    expected = fake_encoder().transform(X)
+    compact = encoder.transform(X)
+    compact.unique_vectors[:] = 0.0
+    np.testing.assert_array_equal(
+        encoder.transform(X).to_dense(), expected)
+
+
+def test_output_dtype():
+    X = ['alice', 'bob']
+    y = fake_encoder().transform(X)
+    assert y.dtype == np.float32
+    y16 = fake_encoder(output_dtype=np.float16).transform(X)
+    assert y16.dtype == np.float16
+    np.testing.assert_allclose(y, y16, atol=1e-3)
+
+
+def test_numba_path():
+    pytest.importorskip('numba')
+    encoder = fake_encoder(use_numba=True)
+    X = ['alice', 'bob', 'alice', 'bob smith']
+    y = encoder.fit_transform(X)
+    assert y.shape == (4, 4)
+    assert y.dtype == np.float32
+    np.testing.assert_array_equal(y[0], y[2])
+    assert not np.array_equal(y[0], y[1])
+    # word vectors are L2-normalized before averaging
+    np.testing.assert_almost_equal(
+        np.linalg.norm(y[0]), 1.0, decimal=5)
+    # the int8-quantized matrix gives close results at 4x less memory
+    encoder_q = fake_encoder(use_numba=True, quantize_inference=True)
+    y_q = encoder_q.transform(X)
+    assert encoder_q._W_q.dtype == np.int8
+    np.testing.assert_allclose(y_q, y, atol=0.05)
+
+
+def test_memory_cache():
+    encoder = fake_encoder()
+    X = ['red', 'green', 'red']
+    y = encoder.transform(X)
+    n_calls = encoder.ft_model.n_calls
+    assert n_calls == 2  # unique strings only
+    # A second transform is served entirely from the in-process cache
+    y2 = encoder.transform(X)
+    assert encoder.ft_model.n_calls == n_calls
+    np.testing.assert_array_equal(y, y2)
+
+
+def test_disk_cache(tmp_path):
+    cache_path = str(tmp_path / 'ft_cache')
+    X = ['red', 'green', 'red', 'blue']
+    encoder = fake_encoder(cache_path=cache_path)
+    y = encoder.transform(X)
+    assert encoder.ft_model.n_calls == 3
+    # A fresh estimator with the same cache_path reads from disk
+    encoder2 = fake_encoder(cache_path=cache_path)
+    y2 = encoder2.transform(X)
+    assert encoder2.ft_model.n_calls == 0
+    np.testing.assert_array_equal(y, y2)
+    # New strings are appended without recomputing the cached ones
+    encoder2.transform(['red', 'pink'])
+    assert encoder2.ft_model.n_calls == 1
+
+
+def test_disk_cache_interleaved_appends(tmp_path):
+    # Two estimators appending to the same cache must not lose each
+    # other's entries: appends merge with the latest snapshot on disk
+    cache_path = str(tmp_path / 'ft_cache')
+    encoder1 = fake_encoder(cache_path=cache_path)
+    encoder2 = fake_encoder(cache_path=cache_path)
+    encoder1.transform(['red'])
+    encoder2.transform(['green'])
+    encoder1.transform(['blue'])
+    encoder3 = fake_encoder(cache_path=cache_path)
+    encoder3.transform(['red', 'green', 'blue'])
+    assert encoder3.ft_model.n_calls == 0
+
+
+def test_intern_strings():
+    X = ['r' + 'ed', 'green', 'red', 'blue']
+    y = fake_encoder().transform(X)
+    y_interned = fake_encoder(intern_strings=True).transform(X)
+    np.testing.assert_array_equal(y, y_interned)
+
+
+def test_transform_iter():
+    X = ['s%d' % (i % 7) for i in range(20)]
+    encoder = fake_encoder()
+    y = encoder.transform(X)
+    batches = list(encoder.transform_iter(X, batch_size=6))
+    assert [len(b) for b in batches] == [6, 6, 6, 2]
+    np.testing.assert_array_equal(np.concatenate(batches), y)
+
+
+def test_pandas_input():
+    pd = pytest.importorskip('pandas')
+    X = ['red', 'green', 'red', 'blue']
+    y = fake_encoder().transform(X)
+    for X_pd in (pd.Series(X), pd.Series(X, dtype='category'),
+                 pd.Categorical(X), pd.DataFrame({'color': X})):
+        np.testing.assert_array_equal(
+            fake_encoder().transform(X_pd), y)
+
+
+def test_shared_input_matrix():
+    encoder = fake_encoder()
+    descriptor = encoder.share_input_matrix()
+    try:
+        clone = PretrainedFastText.from_shared(descriptor)
+        assert clone.use_numba
+        np.testing.assert_array_equal(
+            clone._W, encoder.ft_model.get_input_matrix())
+        clone._shm.close()
+    finally:
+        encoder._shm.unlink()
+
+
+def test_lazy_pickling():
+    # Instantiation does not load the model, and pickling drops the
+    # model and caches so that the estimator stays lightweight
+    encoder = fake_encoder()
+    encoder.transform(['red'])
+    clone = pickle.loads(pickle.dumps(encoder))
+    assert clone._ft_model is None
+    assert clone.get_params() == encoder.get_params()
+
+
+def test_missing_values():
+    encoder = fake_encoder()
+    with pytest.raises(ValueError, match='missing values'):
+        encoder.transform(np.array(['red', np.nan, 'green'],
+                                   dtype=object))
+    pd = pytest.importorskip('pandas')
+    with pytest.raises(ValueError, match='missing values'):
+        encoder.transform(pd.Categorical(['red', None, 'green']))
+
+
+def test_unknown_language():
+    with pytest.raises(ValueError, match='language'):
+        PretrainedFastText(language='klingon')